@@ -28,12 +28,18 @@ algorithm can be found in Gablonsky's `thesis <http://repository.lib.ncsu.edu/ir
 """
 
 from __future__ import print_function
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
 import numpy as np
 try:
-    from .direct import direct
+    from .direct import direct, direct_batched, direct_cfunc
 except ImportError:
     print('Fortran code not compiled, module not functional')
     direct = None
+    direct_batched = None
+    direct_cfunc = None
 
 
 __version_info__ = ('1', '0')
@@ -56,6 +62,33 @@ SUCCESS_MESSAGES = (
     'The volume of the hyperrectangle with best function value found is smaller then volper'
 )
 
+# Message for every status returned by DIRECT, negative values are errors
+_STATUS_MESSAGES = dict(
+    [(-i, msg) for i, msg in enumerate(ERROR_MESSAGES, 1)] +
+    [(i, msg) for i, msg in enumerate(SUCCESS_MESSAGES, 1)])
+
+# Maximal number of variables of the fortran routines (MaxDim in DIRect.f)
+_FORTRAN_MAXDIM = 64
+
+# The fortran routines keep their work arrays in static memory, so only one
+# of them may run at a time
+_fortran_lock = threading.Lock()
+# Set for threads running a fortran routine or evaluating the objective for
+# it, a call of minimize from such a thread would wait for the lock forever
+_fortran_state = threading.local()
+
+# Function values cached by minimize(..., cache=True), shared between calls
+_func_cache = OrderedDict()
+
+def clear_cache():
+    """
+    Remove all function values cached by ``minimize(..., cache=True)``.
+    """
+    _func_cache.clear()
+
+# Sentinel for missing items in OptimizeResult
+_MISSING = object()
+
 # Class for returning the result of an optimization algorithm (copied from
 # scipy.optimize)
 class OptimizeResult(dict):
@@ -91,23 +124,47 @@ class OptimizeResult(dict):
     with attribute accessors, one can see which attributes are available
     using the `keys()` method.
     """
+    # all attributes are stored as items, no instance __dict__ is needed
+    __slots__ = ()
+
     def __getattr__(self, name):
-        try:
-            return self[name]
-        except KeyError:
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
             raise AttributeError(name)
+        return value
 
     __setattr__ = dict.__setitem__
     __delattr__ = dict.__delitem__
 
     def __repr__(self):
-        if self.keys():
-            m = max(map(len, list(self.keys()))) + 1
+        if self:
+            m = max(map(len, self)) + 1
             return '\n'.join([k.rjust(m) + ': ' + repr(v)
                               for k, v in self.items()])
         else:
             return self.__class__.__name__ + "()"
 
+class _FunctionWrapper(object):
+    """
+    Picklable wrapper of ``func(x, *args)``, so that the objective can be
+    evaluated in worker processes. Threads of this process evaluating it are
+    marked as running the fortran routine.
+    """
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.pid = os.getpid()
+
+    def __call__(self, x):
+        if os.getpid() != self.pid:
+            return self.func(x, *self.args)
+        active = getattr(_fortran_state, 'active', False)
+        _fortran_state.active = True
+        try:
+            return self.func(x, *self.args)
+        finally:
+            _fortran_state.active = active
+
 def minimize(func, bounds=None, nvar=None, args=(), disp=False,
              eps=1e-4,
              maxf=20000,
@@ -117,6 +174,12 @@ def minimize(func, bounds=None, nvar=None, args=(), disp=False,
              fglper=0.01,
              volper=-1.0,
              sigmaper=-1.0,
+             vectorized=False,
+             workers=1,
+             backend='fortran',
+             jit_objective=False,
+             cache=False,
+             cache_size=100000,
              **kwargs
              ):
     """
@@ -149,7 +212,12 @@ def minimize(func, bounds=None, nvar=None, args=(), disp=False,
     
     bounds : array-like
             ``(min, max)`` pairs for each element in ``x``, defining
-            the bounds on that parameter.
+            the bounds on that parameter. Alternatively an object with
+            attributes ``lb`` and ``ub`` holding all lower and all upper
+            bounds, such as ``scipy.optimize.Bounds``. The bounds must be
+            finite and the upper bounds larger than the lower bounds,
+            otherwise a ValueError is raised. The fortran backend supports at
+            most 64 variables.
         
     eps : float
         Ensures sufficient decrease in function value when a new potentially
@@ -193,6 +261,60 @@ def minimize(func, bounds=None, nvar=None, args=(), disp=False,
     sigmaper : float
         Terminate the optimization once the measure of the hyperrectangle is less
         than sigmaper.
+
+    vectorized : bool
+        If True, ``func`` is called once per iteration with all points to be
+        sampled in that iteration, as an array of shape ``(nbatch, n)``, and
+        should return an array of the ``nbatch`` function values. This
+        avoids the overhead of one python call per function evaluation.
+
+    workers : int or map-like callable
+        If `workers` is an int other than 1, the points sampled in one
+        iteration are evaluated in parallel by a ``multiprocessing.Pool`` with
+        that many processes (``-1`` uses all available CPU cores).
+        Alternatively supply a map-like callable, such as
+        ``concurrent.futures.ProcessPoolExecutor().map``, which is used to
+        evaluate the points. ``func`` must be picklable. This is worthwhile
+        only for expensive objective functions. Ignored if `vectorized` is
+        True.
+
+    backend : {'fortran', 'numba'}
+        Implementation of DIRECT to use. ``'fortran'`` uses the fortran library
+        by Gablonsky. ``'numba'`` uses a port of the algorithm to python
+        compiled with numba, which calls ``func`` compiled by numba as well
+        (``func`` must therefore be compilable with ``numba.njit``). This
+        avoids the python overhead per function evaluation and is much faster
+        for cheap objective functions. Without `args` the algorithm is
+        compiled once and cached on disk, with `args` it is compiled for every
+        ``func`` and types of `args`.
+        `disp`, `vectorized` and `workers` only apply to the fortran backend.
+        The fortran library runs one optimization at a time, calls from
+        several threads are executed one after the other. The numba backend
+        releases the GIL, so that several optimizations can run in parallel
+        threads.
+
+    jit_objective : bool
+        If True, ``func`` is compiled with numba to a C function, which the
+        fortran library calls directly without going through python. ``func``
+        must be compilable with ``numba.njit``, and `args` are frozen into the
+        compiled function. Compilation takes some time, so this pays off for
+        cheap objective functions with many evaluations. `vectorized` and
+        `workers` are ignored if True. An exception raised by ``func`` can not
+        be propagated; it stops the optimization with ``status`` -5 and
+        ``success`` False instead.
+
+    cache : bool
+        If True, function values are cached and reused by later calls of
+        `minimize` with the same ``func`` and `args` (which must be hashable),
+        e.g. when running DIRECT again with a larger `maxf`. As DIRECT samples
+        the same points in every run, these are not evaluated again. At most
+        `cache_size` values are kept, the least recently used values are
+        discarded first. Use `clear_cache` to empty the cache. Only used when
+        ``func`` is called once per point from python (not with `vectorized`,
+        `workers` or `jit_objective`).
+
+    cache_size : int
+        Maximal number of cached function values.
     
     Returns
     -------
@@ -208,10 +330,32 @@ def minimize(func, bounds=None, nvar=None, args=(), disp=False,
     if bounds is None:
         l = np.zeros(nvar, dtype=np.float64)
         u = np.ones(nvar, dtype=np.float64)
+    elif hasattr(bounds, 'lb') and hasattr(bounds, 'ub'):
+        # always copy, fortran rescales l and u in place
+        l = np.array(bounds.lb, dtype=np.float64)
+        u = np.array(bounds.ub, dtype=np.float64)
     else:
-        bounds = np.asarray(bounds)
-        l = bounds[:, 0] 
-        u = bounds[:, 1] 
+        bounds = np.asarray(bounds, dtype=np.float64)
+        if bounds.ndim != 2 or bounds.shape[1] != 2:
+            raise ValueError('bounds must have shape (n, 2), got %s'
+                             % (bounds.shape,))
+        # transposed copy, so that both rows are contiguous and the bounds
+        # of the caller are not changed (the fortran routines rescale l and
+        # u in place), even if bounds.T is already contiguous
+        bounds_T = np.array(bounds.T, dtype=np.float64, order='C')
+        l, u = bounds_T[0], bounds_T[1]
+
+    # check the bounds here instead of failing in the initialization of DIRECT
+    if l.ndim != 1 or l.shape != u.shape:
+        raise ValueError('lower and upper bounds must be 1-d arrays of the '
+                         'same length')
+    if not (np.isfinite(l).all() and np.isfinite(u).all()):
+        raise ValueError('bounds must be finite')
+    if not (u > l).all():
+        raise ValueError('upper bounds must be larger than lower bounds')
+    if backend == 'fortran' and l.shape[0] > _FORTRAN_MAXDIM:
+        raise ValueError('the fortran backend supports at most %d variables'
+                         % _FORTRAN_MAXDIM)
 
     def _objective_wrap(x, iidata, ddata, cdata, n, iisize, idsize, icsize):
         """
@@ -220,35 +364,111 @@ def minimize(func, bounds=None, nvar=None, args=(), disp=False,
         """
         return func(x, *args), 0
 
-    #
-    # Dummy values so that the python wrapper will comply with the required
-    # signature of the fortran library.
-    #
-    iidata = np.ones(0, dtype=np.int32)
-    ddata = np.ones(0, dtype=np.float64)
-    cdata = np.ones([0,40], dtype=np.uint8)
+    def _objective_wrap_cached(x, iidata, ddata, cdata, n, iisize, idsize,
+                               icsize):
+        """
+        Wrapper objective that looks up the function value in the cache.
+        """
+        key = (func, args, x.tobytes())
+        try:
+            # reinsert to mark as most recently used
+            fx = _func_cache[key] = _func_cache.pop(key)
+        except KeyError:
+            fx = func(x, *args)
+            _func_cache[key] = fx
+            if len(_func_cache) > cache_size:
+                _func_cache.popitem(last=False)
+        return fx, 0
+
+    def _objective_wrap_batch(x, fbatch, flagbatch, n, nbatch):
+        """
+        Wrapper objective for the batched fortran routine. The points are
+        passed column-wise by fortran, so func gets one point per row.
+        """
+        return func(x.T, *args), np.zeros(nbatch, dtype=np.int32)
+
+    def _objective_wrap_parallel(x, fbatch, flagbatch, n, nbatch):
+        """
+        Wrapper objective for the batched fortran routine that evaluates
+        func at the points in parallel.
+        """
+        if pool is not None:
+            fbatch = pool.map(wrapped_func, x.T,
+                              chunksize=max(1, nbatch // nprocs))
+        else:
+            fbatch = list(workers(wrapped_func, x.T))
+        return np.asarray(fbatch), np.zeros(nbatch, dtype=np.int32)
+
+    if backend == 'numba':
+        from ._direct_numba import direct_numba
+        x, fun, ierror = direct_numba(func, l, u, args, eps, maxf, maxT,
+                                      algmethod, fglobal, fglper, volper,
+                                      sigmaper)
+        return _result(x, fun, ierror)
+    elif backend != 'fortran':
+        raise ValueError("backend must be 'fortran' or 'numba'")
+    if getattr(_fortran_state, 'active', False):
+        raise RuntimeError('the fortran backend is not reentrant; '
+                           'use backend="numba"')
+
+    pool = None
+    if jit_objective:
+        from ._direct_numba import objective_cfunc
+        cfunc = objective_cfunc(func, args)
+        solver, objective = direct_cfunc, cfunc.address
+    elif vectorized:
+        solver, objective = direct_batched, _objective_wrap_batch
+    elif workers != 1:
+        solver, objective = direct_batched, _objective_wrap_parallel
+        wrapped_func = _FunctionWrapper(func, args)
+        if not callable(workers):
+            nprocs = multiprocessing.cpu_count() if workers == -1 else workers
+            pool = multiprocessing.Pool(nprocs)
+    elif cache:
+        try:
+            hash((func, args))
+        except TypeError:
+            raise TypeError('cache=True requires hashable func and args')
+        solver, objective = direct, _objective_wrap_cached
+    else:
+        solver, objective = direct, _objective_wrap
 
     #
     # Call the DIRECT algorithm
     #
-    x, fun, ierror = direct(
-                        _objective_wrap,
-                        eps,
-                        maxf,
-                        maxT,
-                        l,
-                        u,
-                        algmethod,
-                        'dummylogfile', 
-                        fglobal,
-                        fglper,
-                        volper,
-                        sigmaper,
-                        iidata,
-                        ddata,
-                        cdata,
-                        disp
-                        )
-
-    return OptimizeResult(x=x,fun=fun, status=ierror, success=ierror>0,
-                          message=SUCCESS_MESSAGES[ierror-1] if ierror>0 else ERROR_MESSAGES[abs(ierror)-1])
+    try:
+        with _fortran_lock:
+            _fortran_state.active = True
+            try:
+                x, fun, ierror = solver(
+                                    objective,
+                                    eps,
+                                    maxf,
+                                    maxT,
+                                    l,
+                                    u,
+                                    algmethod,
+                                    fglobal,
+                                    fglper,
+                                    volper,
+                                    sigmaper,
+                                    disp
+                                    )
+            finally:
+                _fortran_state.active = False
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return _result(x, fun, ierror)
+
+def _result(x, fun, ierror):
+    """
+    Build the OptimizeResult for the status ierror returned by DIRECT.
+    """
+    message = _STATUS_MESSAGES.get(ierror)
+    if message is None:
+        message = 'Unknown DIRECT status %d' % ierror
+    return OptimizeResult(x=x, fun=fun, status=ierror, success=ierror>0,
+                          message=message)
@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+Implementation of the DIRECT algorithm compiled with numba.
+
+This is a python port of the main loop of the fortran implementation, which
+can be used with ``minimize(..., backend='numba')``. The objective function is
+compiled as well, so no python call is needed per function evaluation. For
+objectives without extra arguments the loop gets the objective as a
+first-class function with a fixed signature, so it is compiled only once and
+cached on disk. Otherwise the loop is compiled for every objective and the
+types of its arguments, which are passed at runtime.
+
+All computations are done on the unit hypercube. The hyperrectangles are
+stored in separate arrays for their centers, function values at the centers,
+the number of divisions of each side (``levels``, a side with level k has
+length 3**-k) and their sum (``level_sum``). A hyperrectangle is
+divided into thirds along its longest sides as described by Jones et al., the
+two new hyperrectangles along each side take the positions behind the existing
+ones.
+
+As only the longest sides are divided, the sides of a hyperrectangle which has
+been divided s times in total have p = s % n sides of length 3**-(k+1) and
+n - p sides of length 3**-k with k = s // n. Its size is thus determined by s,
+and the selection of the potentially optimal hyperrectangles only needs the
+function values and ``level_sum``.
+
+``objective_cfunc`` compiles an objective function to a C callback, which is
+used by the fortran routine ``direct_cfunc`` (``minimize(...,
+jit_objective=True)``).
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import numba
+from numba import njit, types
+
+# compiled versions of the most recently used objective functions (and C
+# callbacks for their args), so that they are not compiled again when minimize
+# is called repeatedly with the same function. The compiled functions refer to
+# the objective functions, so they are kept in a bounded dict instead of being
+# tied to the lifetime of the objective.
+_compiled = OrderedDict()
+_MAX_COMPILED = 16
+
+# signature of an objective f(x) without extra arguments
+_OBJECTIVE_SIG = types.float64(types.float64[::1])
+
+# initial number of hyperrectangles for which the arrays are allocated
+_INITIAL_CAPACITY = 1024
+# maximal number of divisions of a hyperrectangle (maxdeep in fortran)
+_MAXDEEP = 600
+# maximal number of divisions of one side, so that levels fit into int8
+_MAXLEVEL = 127
+# length of a side with level k
+_POW3_INV = 1.0 / 3.0**np.arange(_MAXLEVEL + 2)
+
+
+@njit(cache=True)
+def _size_table(n, algmethod):
+    """
+    Size of a hyperrectangle that has been divided s times, for s up to
+    _MAXDEEP: half the length of its diagonal for the original DIRECT
+    algorithm, the length of its longest side for DIRECT-l.
+    """
+    dvals = np.empty(_MAXDEEP + 1)
+    for s in range(_MAXDEEP + 1):
+        k = s // n
+        p = s % n
+        if algmethod == 0:
+            dvals[s] = 0.5 * np.sqrt(n - p + p/9.0) / 3.0**k
+        else:
+            dvals[s] = 1.0 / 3.0**k
+    return dvals
+
+
+@njit(cache=True)
+def _grow(a, count, capacity):
+    """
+    Return a copy of the first count entries of a with room for capacity
+    entries along the first axis.
+    """
+    b = np.empty((capacity,) + a.shape[1:], dtype=a.dtype)
+    b[:count] = a[:count]
+    return b
+
+
+@njit(cache=True)
+def _find_potopt(level_sum, fvals, dvals, n, eps, fmin, algmethod):
+    """
+    Return an int32 mask of the potentially optimal hyperrectangles.
+
+    For every size the hyperrectangle with the lowest function value is
+    potentially optimal if there is a rate-of-change constant K for which it
+    has the lowest value of f - K*size among all sizes and
+    f - K*size <= fmin - eps*|fmin|.
+    For the original DIRECT algorithm (``algmethod=0``) all hyperrectangles of
+    that size with the same function value are potentially optimal as well.
+
+    The first condition holds exactly for the points on the lower right convex
+    hull of the (size, minimal function value) pairs, starting at the largest
+    size with the lowest function value. The hyperrectangles are sorted by
+    size with a counting sort on their level (``level_sum`` for DIRECT, the
+    number of divisions of the longest side for DIRECT-l), then the minima and
+    the hull are found in a single pass each.
+    """
+    nrect = level_sum.shape[0]
+    potopt = np.zeros(nrect, dtype=np.int32)
+    nlevels = _MAXDEEP + 1
+    # counting sort, highest level (smallest size) first
+    starts = np.zeros(nlevels + 1, dtype=np.int64)
+    for i in range(nrect):
+        level = level_sum[i] if algmethod == 0 else level_sum[i] // n
+        starts[nlevels - level] += 1
+    for b in range(nlevels):
+        starts[b + 1] += starts[b]
+    fill = starts[:-1].copy()
+    order = np.empty(nrect, dtype=np.int64)
+    for i in range(nrect):
+        level = level_sum[i] if algmethod == 0 else level_sum[i] // n
+        b = nlevels - 1 - level
+        order[fill[b]] = i
+        fill[b] += 1
+    # position of the minimal function value of every size in use
+    bstart = np.empty(nlevels, dtype=np.int64)
+    best = np.empty(nlevels, dtype=np.int64)
+    nbuckets = 0
+    for b in range(nlevels):
+        if starts[b + 1] > starts[b]:
+            bstart[nbuckets] = b
+            best[nbuckets] = order[starts[b]]
+            for k in range(starts[b] + 1, starts[b + 1]):
+                if fvals[order[k]] < fvals[best[nbuckets]]:
+                    best[nbuckets] = order[k]
+            nbuckets += 1
+
+    b0 = 0
+    for b in range(1, nbuckets):
+        if fvals[best[b]] <= fvals[best[b0]]:
+            b0 = b
+    hull = np.empty(nbuckets - b0, dtype=np.int64)
+    nhull = 0
+    for b in range(b0, nbuckets):
+        db = dvals[level_sum[best[b]]]
+        fb = fvals[best[b]]
+        # drop the last point while it lies above the line from the point
+        # before it to the new one; collinear points stay on the hull
+        while nhull >= 2:
+            d1 = dvals[level_sum[best[hull[nhull - 2]]]]
+            f1 = fvals[best[hull[nhull - 2]]]
+            d2 = dvals[level_sum[best[hull[nhull - 1]]]]
+            f2 = fvals[best[hull[nhull - 1]]]
+            if (d2 - d1)*(fb - f1) - (f2 - f1)*(db - d1) >= 0:
+                break
+            nhull -= 1
+        hull[nhull] = b
+        nhull += 1
+
+    threshold = fmin - eps*abs(fmin)
+    for k in range(nhull):
+        b = hull[k]
+        db = dvals[level_sum[best[b]]]
+        fb = fvals[best[b]]
+        if k < nhull - 1:
+            # the largest K possible is the slope to the next point
+            bnext = best[hull[k + 1]]
+            kup = (fvals[bnext] - fb)/(dvals[level_sum[bnext]] - db)
+            if fb - kup*db > threshold:
+                continue
+        potopt[best[b]] = 1
+        if algmethod == 0:
+            level = bstart[b]
+            for kk in range(starts[level], starts[level + 1]):
+                if fvals[order[kk]] - fb <= 1e-13:
+                    potopt[order[kk]] = 1
+    return potopt
+
+
+@njit(cache=True)
+def _sample_rect(centers, levels, level_sum, idx, first):
+    """
+    Create the centers of the new hyperrectangles c +- delta*e_i along the
+    longest sides i of hyperrectangle idx at positions first, first+1, ...
+    Return the indices of the longest sides.
+    """
+    kmin = np.min(levels[idx])
+    dims = np.nonzero(levels[idx] == kmin)[0]
+    delta = _POW3_INV[kmin + 1]
+    last = first + 2*dims.shape[0]
+    # broadcast the hyperrectangle to all new rows at once, then move the
+    # centers along the divided sides
+    centers[first:last] = centers[idx]
+    levels[first:last] = levels[idx]
+    level_sum[first:last] = level_sum[idx]
+    for k in range(dims.shape[0]):
+        centers[first + 2*k, dims[k]] += delta
+        centers[first + 2*k + 1, dims[k]] -= delta
+    return dims
+
+
+@njit(cache=True)
+def _divide_rect(levels, level_sum, w, idx, first, dims):
+    """
+    Divide hyperrectangle idx, whose new points were created by _sample_rect,
+    starting with the side along which the lowest function value was found.
+    w[k] is the lower function value of the two new points along dims[k].
+    """
+    m = dims.shape[0]
+    ws = np.empty(m)
+    order = np.empty(m, dtype=np.int64)
+    # stable insertion sort of the sides by w, m is at most n and mostly small
+    for k in range(m):
+        wk = w[k]
+        kk = k
+        while kk > 0 and ws[kk - 1] > wk:
+            ws[kk] = ws[kk - 1]
+            order[kk] = order[kk - 1]
+            kk -= 1
+        ws[kk] = wk
+        order[kk] = k
+    for k in range(m):
+        d = dims[order[k]]
+        levels[idx, d] += 1
+        for kk in range(k, m):
+            pos = first + 2*order[kk]
+            levels[pos, d] += 1
+            levels[pos + 1, d] += 1
+        pos = first + 2*order[k]
+        level_sum[pos] += k + 1
+        level_sum[pos + 1] += k + 1
+    level_sum[idx] += m
+
+
+def _direct(f, args, l, u, eps, maxf, maxT, algmethod,
+             fglobal, fglper, volper, sigmaper):
+    """
+    Main loop of DIRECT. Returns the best point found, its function value, the
+    status (see the fortran Ierror), the number of function evaluations and
+    the number of iterations.
+    """
+    n = l.shape[0]
+    scale = u - l
+    # the arrays grow geometrically; like the fortran routine, the last
+    # iteration is always completed, so the number of hyperrectangles can
+    # exceed maxf
+    capacity = _INITIAL_CAPACITY
+    centers = np.empty((capacity, n))
+    levels = np.empty((capacity, n), dtype=np.int8)
+    fvals = np.empty(capacity)
+    level_sum = np.empty(capacity, dtype=np.int32)
+    dvals = _size_table(n, algmethod)
+
+    centers[0] = 0.5
+    levels[0] = 0
+    level_sum[0] = 0
+    fvals[0] = f(l + scale*centers[0], *args)
+    nrect = 1
+    minpos = 0
+    fmin = fvals[0]
+    divfactor = 1.0 if fglobal == 0.0 else abs(fglobal)
+
+    ierror = 2
+    t = 0
+    while t < maxT:
+        t += 1
+        potopt = _find_potopt(level_sum[:nrect], fvals[:nrect], dvals, n,
+                              eps, fmin, algmethod)
+        for j in np.nonzero(potopt)[0]:
+            kmin = np.min(levels[j])
+            nnew = 2*np.sum(levels[j] == kmin)
+            if level_sum[j] + nnew//2 > _MAXDEEP or kmin >= _MAXLEVEL:
+                ierror = -6
+                break
+            if nrect + nnew > capacity:
+                capacity = max(2*capacity, nrect + nnew)
+                centers = _grow(centers, nrect, capacity)
+                levels = _grow(levels, nrect, capacity)
+                fvals = _grow(fvals, nrect, capacity)
+                level_sum = _grow(level_sum, nrect, capacity)
+            dims = _sample_rect(centers, levels, level_sum, j, nrect)
+            # evaluate the new points, updating the minimum and the weights
+            # of the sides in the same pass
+            w = np.empty(nnew // 2)
+            for pos in range(nrect, nrect + nnew):
+                fval = f(l + scale*centers[pos], *args)
+                fvals[pos] = fval
+                k = (pos - nrect) // 2
+                if (pos - nrect) % 2 == 0 or fval < w[k]:
+                    w[k] = fval
+                if fval < fmin:
+                    fmin = fval
+                    minpos = pos
+            _divide_rect(levels, level_sum, w, j, nrect, dims)
+            nrect += nnew
+
+        if ierror == -6:
+            break
+        if 100.0 / 3.0**level_sum[minpos] <= volper:
+            ierror = 4
+            break
+        if dvals[level_sum[minpos]] <= sigmaper:
+            ierror = 5
+            break
+        if 100*(fmin - fglobal)/divfactor <= fglper:
+            ierror = 3
+            break
+        if nrect > maxf:
+            ierror = 1
+            break
+
+    return l + scale*centers[minpos], fmin, ierror, nrect, t
+
+
+# The loop only uses its own arrays, so it can run in several threads at once
+# without the GIL.
+# Objectives with arguments: specialized on the objective function and the
+# types of args. Not cached, as it can not be restored from the on-disk cache
+# in another session.
+_direct_loop = njit(nogil=True)(_direct)
+# Objectives without arguments: compiled for the objective as a first-class
+# function with a fixed signature, so that it is compiled only once.
+_direct_loop_noargs = njit(
+    types.Tuple((types.float64[::1], types.float64, types.int64,
+                 types.int64, types.int64))(
+        types.FunctionType(_OBJECTIVE_SIG), types.Tuple(()),
+        types.float64[::1], types.float64[::1], types.float64, types.int64,
+        types.int64, types.int64, types.float64, types.float64,
+        types.float64, types.float64),
+    cache=True, nogil=True)(_direct)
+
+
+def _lookup(key, compile):
+    """
+    Return the compiled function stored for key, or ``compile()`` if there is
+    none (or key is not hashable).
+    """
+    try:
+        compiled = _compiled.pop(key)
+    except KeyError:
+        compiled = compile()
+    except TypeError:
+        return compile()
+    _compiled[key] = compiled
+    if len(_compiled) > _MAX_COMPILED:
+        _compiled.popitem(last=False)
+    return compiled
+
+
+def _jit(func):
+    """
+    Return ``func`` compiled with ``numba.njit``.
+    """
+    if numba.extending.is_jitted(func):
+        return func
+    return _lookup(('njit', func), lambda: njit(func))
+
+
+def _compile_cfunc(jfunc, args):
+    # numba can not type a call with *args within try
+    @njit
+    def call(x):
+        return jfunc(x, *args)
+
+    @numba.cfunc(types.float64(types.CPointer(types.float64), types.int32,
+                               types.CPointer(types.int32)))
+    def cfunc(x, n, flag):
+        # an exception can not leave a cfunc, so it is reported through flag
+        fx = 0.0
+        try:
+            # copy, as the fortran array must not be changed by func
+            fx = call(numba.carray(x, (n,)).copy())
+        except Exception:
+            flag[0] = 1
+        return fx
+    return cfunc
+
+
+def objective_cfunc(func, args):
+    """
+    Compile ``func(x, *args)`` to a C callback
+    ``double f(double *x, int n, int *flag)``, which sets ``*flag`` to 1 if
+    ``func`` raises an exception. The values in ``args`` are frozen into the
+    compiled code, the callback is reused for the same function and hashable
+    args. The address of the callback is its ``address`` attribute.
+    """
+    args = tuple(args)
+    return _lookup(('cfunc', func, args),
+                   lambda: _compile_cfunc(_jit(func), args))
+
+
+def direct_numba(func, l, u, args, eps, maxf, maxT, algmethod,
+                 fglobal, fglper, volper, sigmaper):
+    """
+    Run DIRECT on ``func(x, *args)`` within the bounds ``l``, ``u``. ``func``
+    is compiled with ``numba.njit`` unless it is already a numba function.
+    Returns the same values as the fortran routine ``direct``.
+    """
+    args = tuple(args)
+    loop = _direct_loop if args else _direct_loop_noargs
+    x, fmin, ierror, nfev, nit = loop(
+        _jit(func), args,
+        np.ascontiguousarray(l, dtype=np.float64),
+        np.ascontiguousarray(u, dtype=np.float64),
+        float(eps), int(maxf), int(maxT), int(algmethod),
+        float(fglobal), float(fglper), float(volper), float(sigmaper))
+    return x, fmin, ierror
@@ -54,7 +54,7 @@ if __name__ == "__main__":
     try:
         thiskwargs = kwargs.copy()
         config = configuration()
-        config.add_extension('direct', sources=['src/direct.pyf', 'src/DIRect.f', 'src/DIRserial.f', 'src/DIRsubrout.f'])
+        config.add_extension('direct', sources=['src/direct.pyf', 'src/DIRect.f', 'src/DIRserial.f', 'src/DIRsubrout.f', 'src/DIRbatch.f', 'src/DIRcfunc.f'])
         thiskwargs.update(config.todict())
         setup(**thiskwargs)
     except:
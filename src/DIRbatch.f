@@ -0,0 +1,542 @@
+C+-----------------------------------------------------------------------+
+C| Program       : Direct.f (subfile DIRbatch.f)                         |
+C| Batched version of DIRECT. Instead of calling the user-supplied       |
+C| function once per sample point, all points sampled in one iteration   |
+C| are collected and passed to the function in a single call.            |
+C+-----------------------------------------------------------------------+
+
+C+-----------------------------------------------------------------------+
+C|    SUBROUTINE Direct_batched                                          |
+C| Same arguments and return values as SUBROUTINE Direct (see DIRect.f), |
+C| except for the user-supplied function fcnb, which is called as        |
+C|                                                                       |
+C|       CALL fcnb(n, nbatch, xbatch, fbatch, flagbatch)                 |
+C|                                                                       |
+C| where xbatch(n,nbatch) contains the points at which the function has  |
+C| to be evaluated. On return fbatch(nbatch) has to contain the function |
+C| values and flagbatch(nbatch) the flags (see DIRinfcn) of the points.  |
+C|                                                                       |
+C| In each iteration the potentially optimal hyperrectangles are first   |
+C| all sampled, then the function is evaluated at all new points and     |
+C| finally the hyperrectangles are divided. The points are evaluated in  |
+C| the same order as in Direct, so both give the same results.           |
+C+-----------------------------------------------------------------------+
+      SUBROUTINE Direct_batched(fcnb, x, n, eps, maxf, maxT, fmin, l, u,
+     +                  algmethod, Ierror, logfilename,
+     +                  fglobal, fglper, volper, sigmaper,
+     +                  iidata, iisize, ddata, idsize, cdata, icsize,
+     +                  disp)
+
+      IMPLICIT NONE
+C+-----------------------------------------------------------------------+
+C| Parameters (see Direct).                                              |
+C+-----------------------------------------------------------------------+
+      INTEGER maxfunc, maxdeep, maxdiv, MaxDim, mdeep
+      PARAMETER (Maxfunc = 90000)
+      PARAMETER (maxdeep = 600)
+      PARAMETER (maxdiv = 3000)
+      PARAMETER (MaxDim = 64)
+
+      INTEGER JONES
+      COMMON /directcontrol/ JONES
+
+      EXTERNAL fcnb
+      INTEGER n, maxf, maxT, algmethod, Ierror, logfile, dwrit, disp
+      CHARACTER*(*) logfilename
+      DOUBLE PRECISION  x(n),fmin,eps,l(n),u(n)
+      DOUBLE PRECISION fglobal, fglper, volper, sigmaper
+
+      INTEGER iisize, idsize, icsize
+      INTEGER iidata(iisize)
+      DOUBLE PRECISION ddata(idsize)
+      Character*40 cdata(icsize)
+
+C+-----------------------------------------------------------------------+
+C| Internal variables (see Direct).                                      |
+C+-----------------------------------------------------------------------+
+      DOUBLE PRECISION  f(maxfunc,2), divfactor
+      INTEGER anchor(-1:maxdeep),S(maxdiv,2)
+      INTEGER point(maxfunc), free
+      DOUBLE PRECISION  c(maxfunc,MaxDim)
+      DOUBLE PRECISION  thirds(0:maxdeep),levels(0:maxdeep)
+      INTEGER length(maxfunc,MaxDim),t,j,actdeep
+      INTEGER Minpos,maxpos,help,numfunc
+      INTEGER ArrayI(MaxDim),maxi,oops,cheat
+      INTEGER List2(MaxDim,2),i,actmaxdeep,oldpos
+      INTEGER start
+      DOUBLE PRECISION  w(MaxDim),kmax, delta
+      INTEGER pos1
+      INTEGER oldmaxf,increase, freeold
+      INTEGER actdeep_div
+      DOUBLE PRECISION  oldl(MaxDim), oldu(MaxDim)
+      DOUBLE PRECISION epsfix
+      INTEGER iepschange
+
+      INTEGER DIRGetMaxdeep, DIRgetlevel
+      DOUBLE PRECISION fmax
+      INTEGER Ifeasiblef, IInfesiblef
+
+C+-----------------------------------------------------------------------+
+C| Variables for the batched evaluation :                                |
+C|  starts -- Position of the first new point of each hyperrectangle in  |
+C|            S, that is the start of its list of sample points.         |
+C|  nbatch -- Number of points to be evaluated in this iteration.        |
+C|   nbcap -- Allocated size of the batch buffers.                       |
+C|   ideep -- Set to 1 if the maximum number of levels will be reached.  |
+C|  xbatch -- Buffer for the points passed to fcnb. It is kept between   |
+C|            iterations and only reallocated if it is too small.        |
+C+-----------------------------------------------------------------------+
+      INTEGER starts(maxdiv), nbatch, nbcap, ideep
+      DOUBLE PRECISION, ALLOCATABLE :: xbatch(:,:), fbatch(:)
+      INTEGER, ALLOCATABLE :: flagbatch(:)
+
+      logfile    = 2
+      dwrit  = disp
+      JONES  = algmethod
+      DO 150,i=1,n
+        oldu(i) = u(i)
+        oldl(i) = l(i)
+150   CONTINUE
+
+      cheat = 0
+      kmax  = 1.D10
+      mdeep = maxdeep
+C+-----------------------------------------------------------------------+
+C| DIRheader is not called (see Direct), so eps is kept constant.        |
+C+-----------------------------------------------------------------------+
+      iepschange = 0
+      epsfix = eps
+      IF (fglobal .EQ. 0.D0) then
+         divfactor = 1.D0
+      ELSE
+         divfactor = abs(fglobal)
+      END IF
+
+      CALL DIRInitSpecific(x,n,
+     +   iidata, iisize, ddata, idsize, cdata, icsize)
+
+      nbcap = 2*n
+      ALLOCATE(xbatch(n,nbcap), fbatch(nbcap), flagbatch(nbcap))
+
+      oldmaxf = maxf
+      increase = 0
+      CALL DIRInitList(anchor,free,point,f,maxfunc,maxdeep)
+      CALL DIRpreprc(u,l,n,l,u,oops)
+      IF (oops .GT. 0) THEN
+        Write(*,10005)
+        IError = -3
+        GOTO 200
+      END IF
+      CALL DIRInitBatch(f,fcnb,c,length,actdeep,point,anchor,free,
+     +   dwrit,logfile,ArrayI,maxI,List2,w,x,l,u,fmin,minpos,
+     +   thirds,levels,maxfunc,maxdeep,n,MaxDim,fmax,Ifeasiblef,
+     +   IInfesiblef, Ierror, xbatch, fbatch, flagbatch, nbcap)
+      IF (Ierror .lt. 0) then
+         IF (Ierror .eq. -4) THEN
+             IF (dwrit .gt. 0) THEN
+                Write(*,10006)
+             ENDIF
+            GOTO 200
+         END IF
+         IF (Ierror .eq. -5) THEN
+            Write(*,10007)
+            GOTO 200
+         END IF
+      END IF
+
+      numfunc = 1 + maxI + maxI
+      actmaxdeep = 1
+      oldpos = 0
+      IF (Ifeasiblef .gt. 0) then
+        IF (dwrit .gt. 0) THEN
+            write(*,10012) 1,numfunc
+        ENDIF
+      ELSE
+        IF (dwrit .gt. 0) THEN
+            Write(*,10002) numfunc, fmin, fmax
+        ENDIF
+      END IF
+      DO 10,t=2,MaxT
+        actdeep = actmaxdeep
+        CALL DIRChoose(anchor,S,maxdeep,f,fmin,eps,levels,maxpos,
+     +     length,maxfunc,maxdeep,maxdiv,n,logfile,dwrit,cheat,kmax,
+     +     Ifeasiblef)
+        IF (algmethod .EQ. 0) THEN
+          CALL DIRDoubleInsert(anchor, S, maxpos, point, f,
+     +           maxdeep, maxfunc, maxdiv, Ierror)
+          IF (Ierror .eq. -6) THEN
+              Write(*,10020)
+              Write(*,10021)
+              Write(*,10022)
+              Write(*,10023)
+              GOTO 200
+          END IF
+        ENDIF
+C+-----------------------------------------------------------------------+
+C| Direct stops as soon as it reaches a hyperrectangle on the maximum    |
+C| level. Only the hyperrectangles before it are divided.                |
+C+-----------------------------------------------------------------------+
+        ideep = 0
+        DO 15,j=1,maxpos
+           IF (S(j,1) .GT. 0) THEN
+              IF (S(j,2)+1 .GE. mdeep) THEN
+                 ideep = 1
+                 maxpos = j - 1
+                 GOTO 16
+              END IF
+           END IF
+15      CONTINUE
+16      oldpos = minpos
+C+-----------------------------------------------------------------------+
+C| Remove all potentially optimal hyperrectangles from their lists and   |
+C| create the new sample points.                                         |
+C+-----------------------------------------------------------------------+
+        nbatch = 0
+        DO 20,j=1,maxpos
+           IF (S(j,1) .GT. 0) THEN
+              actdeep_div = DIRGetmaxdeep(S(j,1),length,maxfunc,n)
+              delta = thirds(actdeep_div+1)
+              actdeep = S(j,2)
+              actmaxdeep = max(actdeep,actmaxdeep)
+              help = S(j,1)
+              IF (.NOT. (anchor(actdeep) .EQ. help)) THEN
+                pos1 = anchor(actdeep)
+                DO WHILE (.NOT. (point(pos1) .EQ. help))
+                  pos1 = point(pos1)
+                END DO
+                point(pos1) = point(help)
+              ELSE
+                anchor(actdeep) = point(help)
+              END IF
+              CALL DIRGet_I(length,help,ArrayI,maxI,n,maxfunc)
+              CALL DIRSamplepoints(c,ArrayI,delta,help,
+     +             start,length,dwrit,logfile,f,free,maxI,point,
+     +             fcnb,x,l,fmin,minpos,u,n,maxfunc,maxdeep,oops)
+              IF (oops .GT. 0) THEN
+                Write(*,10006)
+                IError = -4
+                GOTO 200
+              END IF
+              starts(j) = start
+              nbatch = nbatch + maxI + maxI
+           END IF
+20      CONTINUE
+C+-----------------------------------------------------------------------+
+C| Evaluate the function at all new points with a single call.           |
+C+-----------------------------------------------------------------------+
+        IF (nbatch .GT. nbcap) THEN
+           nbcap = max(nbatch, nbcap + nbcap)
+           DEALLOCATE(xbatch, fbatch, flagbatch)
+           ALLOCATE(xbatch(n,nbcap), fbatch(nbcap), flagbatch(nbcap))
+        END IF
+        CALL DIRSamplefBatch(c,S,starts,maxpos,nbatch,f,point,fcnb,
+     +       l,u,n,maxfunc,maxdiv,fmin,minpos,fmax,
+     +       Ifeasiblef,IInfesiblef,xbatch,fbatch,flagbatch)
+C+-----------------------------------------------------------------------+
+C| Divide the hyperrectangles and insert the new ones into the lists.    |
+C+-----------------------------------------------------------------------+
+        DO 30,j=1,maxpos
+           IF (S(j,1) .GT. 0) THEN
+              help = S(j,1)
+              actdeep_div = DIRGetmaxdeep(help,length,maxfunc,n)
+              CALL DIRGet_I(length,help,ArrayI,maxI,n,maxfunc)
+              start = starts(j)
+              CALL DIRDivide(start,actdeep_div,length,point,
+     +             ArrayI,help,List2,w,maxI,f,maxfunc,maxdeep,n)
+              CALL DIRInsertList(start,anchor,point,f,maxI,length,
+     +                    maxfunc,maxdeep,n,help)
+              numfunc = numfunc + maxI + maxI
+           END IF
+30      CONTINUE
+        IF (ideep .EQ. 1) THEN
+           Write(*,10004)
+           Ierror = -6
+           GOTO 100
+        END IF
+        IF (oldpos .LT. minpos) THEN
+            IF (dwrit .gt. 0) THEN
+                Write(*,10002) numfunc,fmin, fmax
+            END IF
+        END IF
+        IF (Ifeasiblef .gt. 0) then
+          write(*,10012) t,numfunc
+        END IF
+
+        Ierror = Jones
+        Jones = 0
+        actdeep_div = DIRGetlevel(minpos,length,maxfunc,n)
+        Jones = Ierror
+        delta = thirds(actdeep_div)*100
+        IF (delta .LE. volper) THEN
+           Ierror = 4
+           Write(*,10011) delta, volper
+           GOTO 100
+        END IF
+        actdeep_div = DIRGetlevel(minpos,length,maxfunc,n)
+        delta = levels(actdeep_div)
+        IF (delta .LE. sigmaper) THEN
+           Ierror = 5
+           Write(*,10013) delta, sigmaper
+           GOTO 100
+        END IF
+        IF ((100*(fmin - fglobal)/divfactor) .LE. fglper)
+     +   THEN
+           Ierror = 3
+           Write(*,10010)
+           GOTO 100
+        END IF
+        IF (IInfesiblef .gt. 0) THEN
+           CALL DIRreplaceInf(free,freeold,f,c,thirds,length,anchor,
+     +       point,u,l,maxfunc,maxdeep,maxdim,n,logfile, fmax)
+        ENDIF
+        freeold = free
+        IF (iepschange .eq. 1) then
+           eps = max(1.D-4*abs(fmin),epsfix)
+        END IF
+        IF (increase .eq. 1) then
+           maxf = numfunc + oldmaxf
+           IF (Ifeasiblef .eq. 0) then
+             increase = 0
+           END IF
+        END IF
+        IF (numfunc .GT. maxf) THEN
+           IF (Ifeasiblef .eq. 0) then
+              Ierror = 1
+              IF (dwrit .gt. 0) THEN
+                  Write(*,10008)
+              END IF
+              GOTO 100
+           ELSE
+              increase = 1
+              maxf = numfunc+ oldmaxf
+           END IF
+        END IF
+10    CONTINUE
+
+      Ierror = 2
+      IF (dwrit .gt. 0) THEN
+          Write(*,10009)
+      END IF
+
+100   CONTINUE
+      DO 50,i=1,n
+         x(i) = c(Minpos,i)*l(i)+l(i)*u(i)
+         u(i) = oldu(i)
+         l(i) = oldl(i)
+50    CONTINUE
+      maxf = numfunc
+
+      CALL DIRsummary(logfile,x,l,u,n,fmin,fglobal, numfunc, Ierror)
+
+200   CONTINUE
+      DEALLOCATE(xbatch, fbatch, flagbatch)
+
+10002  FORMAT(i5," & ",f18.10," & ",f18.10," \\\\ ")
+10004  FORMAT('WARNING : Maximum number of levels reached. Increase
+     +        maxdeep.')
+10005  FORMAT('WARNING : Initialisation in DIRpreprc failed.')
+10006  FORMAT('WARNING : Error occured in routine DIRsamplepoints.')
+10007  FORMAT('WARNING : Error occured in routine DIRsamplef.')
+10008  FORMAT('DIRECT stopped: numfunc >= maxf.')
+10009  FORMAT('DIRECT stopped: maxT iterations.')
+10010  FORMAT('DIRECT stopped: fmin within fglper of global minimum.')
+10011  FORMAT('DIRECT stopped: Volume of S_min is ',d8.2,
+     +       '% < ',d8.2,'% of the original volume.')
+10012  FORMAT('No feasible point found in ',I4,' iterations ',
+     +       'and ',I5,' function evaluations.')
+10013  FORMAT('DIRECT stopped: Measure of S_min = ',d8.2,' < '
+     +       ,d8.2,'.')
+10020  FORMAT('WARNING : Capacity of array S in DIRDoubleInsert'
+     +        ' reached. Increase maxdiv.')
+10021  FORMAT('This means that there are a lot of hyperrectangles')
+10022  FORMAT('with the same function value at the center. We')
+10023  FORMAT('suggest to use our modification instead (Jones = 1)')
+      END
+
+C+-----------------------------------------------------------------------+
+C|    SUBROUTINE DIRSamplefBatch                                         |
+C| Batched version of DIRSamplef. Evaluates the function at the new      |
+C| points of all hyperrectangles in S, which are stored in the lists     |
+C| starting at starts(j), with a single call to fcnb.                    |
+C+-----------------------------------------------------------------------+
+      SUBROUTINE DIRSamplefBatch(c,S,starts,maxpos,nbatch,f,point,fcnb,
+     +           l,u,n,maxfunc,maxdiv,fmin,minpos,fmax,
+     +           IFeasiblef,IInfesiblef,xbatch,fbatch,flagbatch)
+      IMPLICIT NONE
+      EXTERNAL fcnb
+      INTEGER n,maxfunc,maxdiv,maxpos,nbatch
+      INTEGER S(maxdiv,2),starts(maxdiv),point(maxfunc)
+      DOUBLE PRECISION c(maxfunc,n),f(maxfunc,2),l(n),u(n)
+      DOUBLE PRECISION fmin,fmax
+      INTEGER minpos,IFeasiblef,IInfesiblef
+      DOUBLE PRECISION xbatch(n,nbatch),fbatch(nbatch)
+      INTEGER flagbatch(nbatch)
+      INTEGER i,j,k,pos,kret
+
+      IF (nbatch .EQ. 0) RETURN
+C+-----------------------------------------------------------------------+
+C| Copy the new points into xbatch and transform them back to the        |
+C| original hyperrectangle (see DIRinfcn).                               |
+C+-----------------------------------------------------------------------+
+      k = 0
+      DO 10,j=1,maxpos
+        IF (S(j,1) .GT. 0) THEN
+          pos = starts(j)
+          DO WHILE (pos .GT. 0)
+            k = k + 1
+            DO 20,i=1,n
+              xbatch(i,k) = (c(pos,i)+u(i))*l(i)
+20          CONTINUE
+            pos = point(pos)
+          END DO
+        END IF
+10    CONTINUE
+      DO 25,k=1,nbatch
+        fbatch(k) = 0.D0
+25    CONTINUE
+      CALL fcnb(n,nbatch,xbatch,fbatch,flagbatch)
+C+-----------------------------------------------------------------------+
+C| Store the function values in the same way as DIRSamplef.              |
+C+-----------------------------------------------------------------------+
+      k = 0
+      DO 30,j=1,maxpos
+        IF (S(j,1) .GT. 0) THEN
+          pos = starts(j)
+          DO WHILE (pos .GT. 0)
+            k = k + 1
+            f(pos,1) = fbatch(k)
+            kret = flagbatch(k)
+            IInfesiblef = max(IInfesiblef,kret)
+            IF (kret .eq. 0) then
+              f(pos,2) = 0.D0
+              IFeasiblef = 0
+              fmax = max(f(pos,1),fmax)
+            END if
+            IF (kret .ge. 1) then
+              f(pos,2) = 2.D0
+              f(pos,1) = fmax
+            END if
+            IF (kret .eq. -1) then
+              f(pos,2) = -1.D0
+            END if
+            pos = point(pos)
+          END DO
+        END IF
+30    CONTINUE
+C+-----------------------------------------------------------------------+
+C| Update the minimal value found so far.                                |
+C+-----------------------------------------------------------------------+
+      DO 50,j=1,maxpos
+        IF (S(j,1) .GT. 0) THEN
+          pos = starts(j)
+          DO WHILE (pos .GT. 0)
+            IF ((f(pos,1) .LT. fmin) .and. (f(pos,2) .eq. 0)) THEN
+              fmin = f(pos,1)
+              minpos = pos
+            END IF
+            pos = point(pos)
+          END DO
+        END IF
+50    CONTINUE
+      END
+
+C+-----------------------------------------------------------------------+
+C|    SUBROUTINE DIRInitBatch                                            |
+C| Batched version of DIRInit. The center of the hypercube is evaluated  |
+C| first, then the 2n points around it with a single call to fcnb.       |
+C+-----------------------------------------------------------------------+
+      SUBROUTINE DIRInitBatch(f,fcnb,c,length,actdeep,point,anchor,
+     + free,dwrit,logfile,ArrayI,maxI,List2,w,x,l,u,fmin,minpos,thirds,
+     + levels,maxfunc,maxdeep,n,maxor,fmax,Ifeasiblef,IInfeasible,
+     + Ierror,xbatch,fbatch,flagbatch,nbcap)
+      IMPLICIT None
+      Integer maxfunc,maxdeep,n,maxor,nbcap
+      Double Precision  f(maxfunc,2),c(maxfunc,maxor),fmin
+      Double Precision  x(n),delta, thirds(0:maxdeep)
+      Double Precision  levels(0:maxdeep)
+      Integer length(maxfunc,maxor),actdeep,minpos,i,oops,j
+      Integer point(maxfunc),anchor(-1:maxdeep),free
+      Integer ArrayI(maxor),maxI,new,dwrit,logfile,List2(maxor,2)
+      Double Precision  w(maxor)
+      External fcnb
+      Double Precision help2,l(n),u(n)
+      Double Precision fmax
+      Integer Ifeasiblef, Ierror, IInfeasible
+      Double Precision xbatch(n,nbcap),fbatch(nbcap)
+      Integer flagbatch(nbcap)
+      Integer S(1,2),starts(1)
+      Integer JONES
+      COMMON /directcontrol/ JONES
+
+      fmin = 1.D20
+      IF (JONES .eq. 0) THEN
+        DO 5,j = 0,n-1
+          w(j+1) = 0.5D0 * dsqrt(n - j + j/9.D0)
+5       CONTINUE
+        help2 = 1.D0
+        DO 10,i = 1,maxdeep/n
+          DO 8, j = 0, n-1
+            levels((i-1)*n+j) = w(j+1) / help2
+8         CONTINUE
+          help2 = help2 * 3.D0
+10      CONTINUE
+      ELSE
+        help2 = 3.D0
+        DO 11,i = 1,maxdeep
+          levels(i) = 1.D0 / help2
+          help2 = help2 * 3.D0
+11      CONTINUE
+        levels(0) = 1.D0
+      ENDIF
+      help2 = 3.D0
+      DO 21,i = 1,maxdeep
+        thirds(i) = 1.D0 / help2
+        help2 = help2 * 3.D0
+21    CONTINUE
+      thirds(0) = 1.D0
+      DO 20,i=1,n
+        c(1,i) = 0.5D0
+        x(i) = 0.5D0
+        length(1,i) = 0
+        xbatch(i,1) = (0.5D0+u(i))*l(i)
+20    CONTINUE
+      fbatch(1) = 0.D0
+      CALL fcnb(n,1,xbatch,fbatch,flagbatch)
+      f(1,1) = fbatch(1)
+      f(1,2) = flagbatch(1)
+      IInfeasible = flagbatch(1)
+      fmax = f(1,1)
+      if (f(1,2) .gt. 0.D0) then
+        f(1,1) = 1.D6
+        fmax = f(1,1)
+        Ifeasiblef = 1
+      else
+        Ifeasiblef = 0
+      end if
+
+      fmin = f(1,1)
+      minpos = 1
+      actdeep = 2
+      point(1) = 0
+      free = 2
+      delta = thirds(1)
+      CALL DIRGet_I(length,1,ArrayI,maxI,n,maxfunc)
+      new = free
+      CALL DIRSamplepoints(c,ArrayI,delta,1,new,length,
+     +           dwrit,logfile,f,free,maxI,point,fcnb,x,l,
+     +           fmin,minpos,u,n,
+     +           maxfunc,maxdeep,oops)
+      IF (oops .GT. 0) THEN
+         IError = -4
+         return
+      END IF
+      S(1,1) = 1
+      starts(1) = new
+      CALL DIRSamplefBatch(c,S,starts,1,maxI+maxI,f,point,fcnb,
+     +     l,u,n,maxfunc,1,fmin,minpos,fmax,
+     +     Ifeasiblef,IInfeasible,xbatch,fbatch,flagbatch)
+      CALL DIRDivide(new,0,length,point,
+     +  ArrayI,1,List2,w,maxI,f,maxfunc,maxdeep,n)
+      CALL DIRInsertList(new,anchor,point,f,maxI,length,
+     +                    maxfunc,maxdeep,n,1)
+      END
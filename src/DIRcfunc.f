@@ -0,0 +1,93 @@
+C+-----------------------------------------------------------------------+
+C| Program       : Direct.f (subfile DIRcfunc.f)                         |
+C| Version of DIRECT for a user-supplied function compiled to C, which   |
+C| is called through a function pointer.                                 |
+C+-----------------------------------------------------------------------+
+
+C+-----------------------------------------------------------------------+
+C| Module holding the pointer to the C function, which has the signature |
+C|                                                                       |
+C|       double f(double *x, int n, int *flag)                           |
+C|                                                                       |
+C| and sets flag to a nonzero value if the function could not be         |
+C| evaluated.                                                            |
+C+-----------------------------------------------------------------------+
+      MODULE DIRcfuncptr
+      USE, INTRINSIC :: iso_c_binding
+      IMPLICIT NONE
+      ABSTRACT INTERFACE
+        FUNCTION DIRcobjective(x, n, flag) BIND(C)
+          IMPORT :: c_double, c_int
+          REAL(c_double) DIRcobjective
+          REAL(c_double) x(*)
+          INTEGER(c_int), VALUE :: n
+          INTEGER(c_int) flag
+        END FUNCTION DIRcobjective
+      END INTERFACE
+      PROCEDURE(DIRcobjective), POINTER :: cfcn => NULL()
+      END MODULE DIRcfuncptr
+
+C+-----------------------------------------------------------------------+
+C|    SUBROUTINE Direct_cfunc                                            |
+C| Same arguments and return values as SUBROUTINE Direct (see DIRect.f), |
+C| except for the user-supplied function, which is given by the address  |
+C| faddr of a C function (see module DIRcfuncptr). If the function sets  |
+C| its flag, Direct returns with Ierror = -5.                            |
+C+-----------------------------------------------------------------------+
+      SUBROUTINE Direct_cfunc(faddr, x, n, eps, maxf, maxT, fmin, l, u,
+     +                  algmethod, Ierror, logfilename,
+     +                  fglobal, fglper, volper, sigmaper,
+     +                  iidata, iisize, ddata, idsize, cdata, icsize,
+     +                  disp)
+
+      USE DIRcfuncptr
+      IMPLICIT NONE
+      INTEGER(c_intptr_t) faddr
+      EXTERNAL DIRcfcn
+      INTEGER n, maxf, maxT, algmethod, Ierror, disp
+      CHARACTER*(*) logfilename
+      DOUBLE PRECISION  x(n),fmin,eps,l(n),u(n)
+      DOUBLE PRECISION fglobal, fglper, volper, sigmaper
+
+      INTEGER iisize, idsize, icsize
+      INTEGER iidata(iisize)
+      DOUBLE PRECISION ddata(idsize)
+      Character*40 cdata(icsize)
+
+      CALL C_F_PROCPOINTER(TRANSFER(faddr, C_NULL_FUNPTR), cfcn)
+      CALL Direct(DIRcfcn, x, n, eps, maxf, maxT, fmin, l, u,
+     +            algmethod, Ierror, logfilename,
+     +            fglobal, fglper, volper, sigmaper,
+     +            iidata, iisize, ddata, idsize, cdata, icsize,
+     +            disp)
+      cfcn => NULL()
+      END
+
+C+-----------------------------------------------------------------------+
+C| User-supplied function for Direct, which calls the C function.        |
+C+-----------------------------------------------------------------------+
+      SUBROUTINE DIRcfcn(n, x, f, flag,
+     +                   iidata, iisize, ddata, idsize, cdata, icsize)
+      USE DIRcfuncptr
+      IMPLICIT NONE
+      INTEGER n, flag
+      INTEGER(c_int) cflag
+      DOUBLE PRECISION x(n), f
+
+      INTEGER iisize, idsize, icsize
+      INTEGER iidata(iisize)
+      DOUBLE PRECISION ddata(idsize)
+      Character*40 cdata(icsize)
+
+      cflag = 0
+      f = cfcn(x, n, cflag)
+C+-----------------------------------------------------------------------+
+C| An error in the function is reported as a failure in the setup, which |
+C| stops the sampling in DIRSamplef (see DIRserial.f).                   |
+C+-----------------------------------------------------------------------+
+      IF (cflag .ne. 0) THEN
+        flag = -1
+      ELSE
+        flag = 0
+      END IF
+      END
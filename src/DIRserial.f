@@ -95,9 +95,13 @@ C+-----------------------------------------------------------------------+
 C+-----------------------------------------------------------------------+
 C|  IF the function could not be evaluated due to a failure in            |
 C| the setup, mark this.                                                 |
+C| Also stop sampling and set oops, so that Direct returns with          |
+C| Ierror = -5.                                                          |
 C+-----------------------------------------------------------------------+
          IF (kret .eq. -1) then
            f(pos,2) = -1.D0
+           oops = 1
+           RETURN
          END if
 C+-----------------------------------------------------------------------+
 C| Set the position to the next point, at which the function             |
@@ -1,6 +1,9 @@
-from scipydirect import minimize
+import collections
+from multiprocessing.pool import ThreadPool
+from scipydirect import minimize, clear_cache
 import numpy as np
 import numpy.testing as npt
+import pytest
 
 def func(x):
     x -=  np.array([-1, 2, -4, 3])
@@ -11,5 +14,143 @@ def test_minimize():
     res = minimize(func, bounds)
     npt.assert_allclose(res.x, np.array([-1, 2, -4, 3]), atol=0.1)
 
+Bounds = collections.namedtuple('Bounds', ['lb', 'ub'])
+
+def test_minimize_split_bounds():
+    bounds = [(-10, 10) for i in range(4)]
+    res = minimize(func, bounds)
+    lb, ub = -10*np.ones(4), 10*np.ones(4)
+    res_split = minimize(func, Bounds(lb, ub))
+    npt.assert_array_equal(res_split.x, res.x)
+    # the arrays of the caller are not changed, also if func fails
+    npt.assert_array_equal(lb, -10*np.ones(4))
+    npt.assert_array_equal(ub, 10*np.ones(4))
+    def func_failing(x):
+        raise RuntimeError
+    with pytest.raises(Exception):
+        minimize(func_failing, Bounds(lb, ub))
+    npt.assert_array_equal(lb, -10*np.ones(4))
+    npt.assert_array_equal(ub, 10*np.ones(4))
+    # same for (n, 2) arrays whose transpose is contiguous
+    for bounds in [np.asfortranarray([[-10., 10.] for i in range(4)]),
+                   np.array([[-10., 10.]])]:
+        expected = bounds.copy()
+        f = func if bounds.shape[0] == 4 else lambda x: x[0]**2
+        minimize(f, bounds)
+        npt.assert_array_equal(bounds, expected)
+        with pytest.raises(Exception):
+            minimize(func_failing, bounds)
+        npt.assert_array_equal(bounds, expected)
+
+def test_minimize_pair_bounds():
+    # a tuple of two arrays are the bounds of two variables
+    res = minimize(lambda x: np.sum(x**2),
+                   (np.array([0., 5.]), np.array([1., 10.])))
+    npt.assert_allclose(res.x, [0, 1], atol=1e-3)
+
+def test_minimize_invalid_bounds():
+    with pytest.raises(ValueError):
+        minimize(func, [(-10, 10, 0) for i in range(4)])
+    with pytest.raises(ValueError):
+        minimize(func, [(-10, np.inf) for i in range(4)])
+    with pytest.raises(ValueError):
+        minimize(func, [(10, -10) for i in range(4)])
+    with pytest.raises(ValueError):
+        minimize(lambda x: np.dot(x, x), [(0, 1) for i in range(70)])
+
+def test_minimize_vectorized():
+    bounds = [(-10, 10) for i in range(4)]
+    def func_vectorized(x):
+        x = x - np.array([-1, 2, -4, 3])
+        return np.sum(x**2, axis=1)
+    res = minimize(func, bounds)
+    res_vectorized = minimize(func_vectorized, bounds, vectorized=True)
+    npt.assert_array_equal(res_vectorized.x, res.x)
+    npt.assert_equal(res_vectorized.fun, res.fun)
+
+def test_minimize_workers():
+    bounds = [(-10, 10) for i in range(4)]
+    res = minimize(func, bounds)
+    res_parallel = minimize(func, bounds, workers=2)
+    npt.assert_array_equal(res_parallel.x, res.x)
+    npt.assert_equal(res_parallel.fun, res.fun)
+
+def test_minimize_cache():
+    bounds = [(-10, 10) for i in range(4)]
+    calls = []
+    def func_counted(x):
+        calls.append(1)
+        return func(x)
+    clear_cache()
+    res = minimize(func_counted, bounds, maxf=1000, cache=True)
+    ncalls = len(calls)
+    res_cached = minimize(func_counted, bounds, maxf=1000, cache=True)
+    assert len(calls) == ncalls
+    npt.assert_array_equal(res_cached.x, res.x)
+    clear_cache()
+    with pytest.raises(TypeError):
+        minimize(lambda x, a: func(x), bounds, args=(np.ones(4),), cache=True)
+
+def test_minimize_nested():
+    # the fortran routines are not reentrant, nested calls must not deadlock
+    def func_nested(x):
+        return minimize(func, [(-10, 10) for i in range(4)], maxf=30).fun
+    with pytest.raises(RuntimeError):
+        minimize(func_nested, [(0, 1)])
+    pool = ThreadPool(2)
+    with pytest.raises(RuntimeError):
+        minimize(func_nested, [(0, 1)], workers=pool.map)
+    pool.close()
+    res = minimize(func, [(-10, 10) for i in range(4)])
+    npt.assert_allclose(res.x, np.array([-1, 2, -4, 3]), atol=0.1)
+
+def test_minimize_numba():
+    pytest.importorskip('numba', minversion='0.49')
+    bounds = [(-10, 10) for i in range(4)]
+    res = minimize(func, bounds, backend='numba')
+    npt.assert_allclose(res.x, np.array([-1, 2, -4, 3]), atol=0.1)
+    res = minimize(func, bounds, backend='numba', algmethod=1)
+    npt.assert_allclose(res.x, np.array([-1, 2, -4, 3]), atol=0.1)
+    res_fortran = minimize(func, bounds, algmethod=1)
+    npt.assert_allclose(res.fun, res_fortran.fun, atol=1e-12)
+    res = minimize(func, bounds, backend='numba', fglobal=0, fglper=1e-3)
+    assert res.status == 3
+    assert res.fun <= 1e-5
+
+    # terminated by maxf within an iteration, which is completed as in fortran
+    def rosen(x):
+        return np.sum(100*(x[1:] - x[:-1]**2)**2 + (1 - x[:-1])**2)
+    bounds = [(-2, 2) for i in range(3)]
+    res = minimize(rosen, bounds, maxf=100, backend='numba')
+    res_fortran = minimize(rosen, bounds, maxf=100)
+    assert res.status == res_fortran.status == 1
+    npt.assert_allclose(res.x, res_fortran.x, atol=1e-12)
+    npt.assert_allclose(res.fun, res_fortran.fun, atol=1e-12)
+
+def test_minimize_jit_objective():
+    pytest.importorskip('numba', minversion='0.49')
+    bounds = [(-10, 10) for i in range(4)]
+    res = minimize(func, bounds)
+    res_jit = minimize(func, bounds, jit_objective=True)
+    npt.assert_array_equal(res_jit.x, res.x)
+    npt.assert_equal(res_jit.fun, res.fun)
+
+    def func_failing(x):
+        if x[0] > 0.5:
+            raise ValueError('x too large')
+        return x[0]
+    res = minimize(func_failing, [(0, 1)], jit_objective=True)
+    assert not res.success
+    assert res.status == -5
+
 if __name__ == '__main__':
     test_minimize()
+    test_minimize_split_bounds()
+    test_minimize_pair_bounds()
+    test_minimize_invalid_bounds()
+    test_minimize_vectorized()
+    test_minimize_workers()
+    test_minimize_cache()
+    test_minimize_nested()
+    test_minimize_numba()
+    test_minimize_jit_objective()